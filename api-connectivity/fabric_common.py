@@ -0,0 +1,253 @@
+# MIT License - Copyright (c) 2026 apkola29
+# This script is provided as-is with no warranty. See LICENSE for details.
+#
+# Vendored copy: the source of truth is common/fabric_common.py. Edit that file
+# and run `python common/sync.py` to refresh the copy in each project folder.
+
+"""
+Shared helpers for the Fabric scripts in this repository.
+
+Each project folder is installed and run on its own, so it carries an
+identical copy of this module next to its script. Provides:
+
+    - SESSION          pooled requests.Session with retry policies
+                       (NON_IDEMPOTENT_SESSION, same pool, for calls that
+                       must not replay)
+    - get_token /      OAuth2 client_credentials grant, with an on-disk
+      get_cached_token token cache shared across all the tools
+    - FabricClient     adds a refreshing Bearer token to SESSION calls
+    - build_parser /   --flag / FABRIC_* env-var config with input()
+      prompt_config    prompts for anything missing
+"""
+
+import argparse
+import codecs
+import getpass
+import hashlib
+import json
+import os
+import pathlib
+import tempfile
+import time
+import typing as t
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    from orjson import dumps as json_dumps, loads as _json_loads
+except ImportError:  # orjson is optional -- fall back to the standard library
+    _json_loads = json.loads
+
+    def json_dumps(obj) -> bytes:
+        return json.dumps(obj, separators=(",", ":")).encode()
+
+
+def json_loads(data: bytes | str) -> t.Any:
+    """Parse JSON, skipping the UTF-8 BOM that Power BI often prefixes bodies with."""
+    if isinstance(data, bytes):
+        data = data.removeprefix(codecs.BOM_UTF8)
+    else:
+        data = data.removeprefix("\ufeff")
+    return _json_loads(data)
+
+
+# ---------------------------------------------------------------------------
+# HTTP session
+# ---------------------------------------------------------------------------
+
+# Shared across all calls so the pooled TLS connection is reused
+SESSION = requests.Session()
+# Transient throttling and gateway errors are retried with jittered backoff,
+# honouring Retry-After. The final response is returned rather than raised,
+# so raise_for_status() still surfaces it as an HTTPError.
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=16,
+    max_retries=Retry(
+        total=5,
+        backoff_factor=0.5,
+        backoff_jitter=0.3,
+        status_forcelist=[429, 500, 502, 503, 504],
+        respect_retry_after_header=True,
+        allowed_methods=frozenset(["GET", "POST"]),
+        raise_on_status=False,
+    ),
+))
+# Entra ID throttles bursty SPN token requests harder -- fewer, slower retries
+SESSION.mount("https://login.microsoftonline.com/", HTTPAdapter(
+    max_retries=Retry(
+        total=3,
+        backoff_factor=1.0,
+        backoff_jitter=0.3,
+        status_forcelist=[429, 500, 502, 503, 504],
+        respect_retry_after_header=True,
+        allowed_methods=frozenset(["POST"]),
+        raise_on_status=False,
+    ),
+))
+SESSION.headers.update({"Accept": "application/json"})
+
+# For POSTs that must not run twice (e.g. MCP tools/call), only responses
+# where the server refused the work -- throttling and unavailable -- are
+# retried; a 500/502/504 or a read timeout may follow a request the server
+# already acted on.
+_no_replay_adapter = HTTPAdapter(
+    max_retries=Retry(
+        total=5,
+        read=0,
+        backoff_factor=0.5,
+        backoff_jitter=0.3,
+        status_forcelist=[429, 503],
+        respect_retry_after_header=True,
+        allowed_methods=frozenset(["POST"]),
+        raise_on_status=False,
+    ),
+)
+# Retries are passed per request, so both policies can draw on SESSION's
+# pool -- a tools/call reuses the connection its tools/list already opened
+_no_replay_adapter.poolmanager = SESSION.get_adapter("https://").poolmanager
+NON_IDEMPOTENT_SESSION = requests.Session()
+NON_IDEMPOTENT_SESSION.mount("https://", _no_replay_adapter)
+NON_IDEMPOTENT_SESSION.headers.update({"Accept": "application/json"})
+
+# Extra headers for requests that send a pre-encoded JSON body
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+# (config key, prompt label) -- each key also maps to a --flag and FABRIC_* env var
+SPN_FIELDS = [
+    ("tenant_id", "Tenant ID"),
+    ("client_id", "Client ID"),
+    ("client_secret", "Client Secret"),
+]
+
+
+def build_parser(description: str, fields: list) -> argparse.ArgumentParser:
+    """Build a parser with one optional flag per field, defaulting to its FABRIC_* env var."""
+    parser = argparse.ArgumentParser(
+        description=description,
+        epilog="Prefer FABRIC_CLIENT_SECRET over --client-secret; flags are visible to other users.",
+    )
+    for key, _ in fields:
+        parser.add_argument(
+            f"--{key.replace('_', '-')}",
+            default=os.environ.get(f"FABRIC_{key.upper()}"),
+        )
+    return parser
+
+
+def prompt_config(args: argparse.Namespace, fields: list) -> dict:
+    """Resolve each field from its flag / env var, prompting for any still missing."""
+    config = {}
+    for key, label in fields:
+        value = getattr(args, key)
+        if not value:
+            read = getpass.getpass if key == "client_secret" else input
+            value = read(f"  {label:<15}: ").strip()
+        config[key] = value
+
+    if not all(config.values()):
+        print("\n  [ERROR] All fields are required.")
+        raise SystemExit(1)
+    return config
+
+
+# ---------------------------------------------------------------------------
+# Authentication
+# ---------------------------------------------------------------------------
+
+def get_token(config: dict, scope: str) -> dict:
+    """Acquire a token via OAuth2 client_credentials grant; returns the raw response."""
+    url = f"https://login.microsoftonline.com/{config['tenant_id']}/oauth2/v2.0/token"
+    resp = SESSION.post(url, data={
+        "grant_type": "client_credentials",
+        "client_id": config["client_id"],
+        "client_secret": config["client_secret"],
+        "scope": scope,
+    })
+    resp.raise_for_status()
+    return json_loads(resp.content)
+
+
+def get_cached_token(config: dict, scope: str, refresh: bool = False) -> dict:
+    """Return {access_token, expires_at}, reusing the on-disk cache until near expiry.
+
+    With ``refresh=True`` the cache is skipped and a new token is requested
+    (and cached), e.g. to prove the SPN credentials are still valid.
+    """
+    key = hashlib.sha256(
+        f"{config['tenant_id']}{config['client_id']}{config['client_secret']}{scope}".encode()
+    ).hexdigest()
+    path = pathlib.Path(tempfile.gettempdir()) / f"fabric_token_{key}.json"
+
+    try:
+        cached = json_loads(path.read_bytes())
+        if not refresh and cached["expires_at"] > time.time():
+            return cached
+    except (OSError, ValueError, KeyError):
+        pass
+
+    data = get_token(config, scope)
+    entry = {
+        "access_token": data["access_token"],
+        "expires_at": time.time() + data["expires_in"] - 60,
+    }
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(json_dumps(entry))
+        os.chmod(path, 0o600)
+    except OSError:
+        pass  # Caching is best-effort
+    return entry
+
+
+class FabricClient:
+    """REST client that adds a Bearer token to calls on the shared session.
+
+    ``fetch_token`` returns ``(access_token, expires_at)`` and is called again
+    once the held token nears expiry, so a long-running session never sends
+    an expired token.
+    """
+
+    def __init__(self, fetch_token: t.Callable[[], tuple[str, float]]) -> None:
+        self.session = SESSION
+        self.auth_header = ""
+        self._fetch_token = fetch_token
+        self._token = ""
+        self._token_exp = 0.0
+
+    @classmethod
+    def for_spn(cls, config: dict, scope: str) -> "FabricClient":
+        """Client whose token comes from the SPN grant via the on-disk cache."""
+        def fetch() -> tuple[str, float]:
+            entry = get_cached_token(config, scope)
+            return entry["access_token"], entry["expires_at"]
+
+        return cls(fetch)
+
+    def token(self) -> str:
+        """Return a valid access token, refreshing it if it is about to expire."""
+        if time.time() >= self._token_exp:
+            self._token, self._token_exp = self._fetch_token()
+            self.auth_header = f"Bearer {self._token}"
+        return self._token
+
+    def _auth(self, request: requests.PreparedRequest) -> requests.PreparedRequest:
+        request.headers["Authorization"] = self.auth_header
+        return request
+
+    def get(self, url: str, **kwargs: t.Any) -> requests.Response:
+        self.token()
+        return self.session.get(url, auth=self._auth, **kwargs)
+
+    def post(self, url: str, idempotent: bool = True, **kwargs: t.Any) -> requests.Response:
+        """POST via the shared session; pass ``idempotent=False`` for calls that must not be replayed."""
+        self.token()
+        session = self.session if idempotent else NON_IDEMPOTENT_SESSION
+        return session.post(url, auth=self._auth, **kwargs)
@@ -10,70 +10,60 @@ to a Microsoft Fabric workspace. Runs three checks:
   1. Token acquisition  - OAuth2 client_credentials grant
   2. List workspace items - GET /v1/workspaces/{workspaceId}/items
   3. Get specific item   - GET /v1/workspaces/{workspaceId}/items/{itemId}
-                           (optional, only if an item ID is provided)
+                           (for every listed item, fetched in parallel;
+                           skipped if the workspace is empty)
 
 Authentication:
     POST https://login.microsoftonline.com/{tenantId}/oauth2/v2.0/token
     scope = https://api.fabric.microsoft.com/.default
 
 Usage:
-    python test_connectivity.py
+    python test_connectivity.py [--tenant-id ...] [--client-id ...] [--workspace-id ...]
+
+    Any value not given as a flag or FABRIC_* environment variable is prompted for.
 """
 
-import sys
-import json
-import requests
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from fabric_common import (
+    FabricClient, SPN_FIELDS, build_parser, get_cached_token, json_loads, prompt_config,
+)
+
+
+SCOPE = "https://api.fabric.microsoft.com/.default"
+FABRIC_API = "https://api.fabric.microsoft.com/v1"
+
+# (config key, prompt label) -- each key also maps to a --flag and FABRIC_* env var
+CONFIG_FIELDS = SPN_FIELDS + [
+    ("workspace_id", "Workspace ID"),
+]
+
 
+def parse_args() -> argparse.Namespace:
+    """Parse optional CLI flags. Each defaults to its FABRIC_* environment variable."""
+    return build_parser("Fabric API connectivity test", CONFIG_FIELDS).parse_args()
 
-def get_config() -> dict:
-    """Prompt for SPN credentials and Fabric workspace ID."""
+
+def get_config(args: argparse.Namespace) -> dict:
+    """Collect SPN credentials and Fabric workspace ID, prompting for any not given."""
     print("=" * 60)
     print("  Fabric API - Connectivity Test")
     print("=" * 60)
     print()
     print("Enter your SPN and Fabric details below.")
     print()
+    return prompt_config(args, CONFIG_FIELDS)
 
-    tenant_id    = input("  Tenant ID      : ").strip()
-    client_id    = input("  Client ID      : ").strip()
-    client_secret = input("  Client Secret  : ").strip()
-    workspace_id = input("  Workspace ID   : ").strip()
-
-    if not all([tenant_id, client_id, client_secret, workspace_id]):
-        print("\n  [ERROR] All fields are required.")
-        raise SystemExit(1)
-
-    return {
-        "tenant_id": tenant_id,
-        "client_id": client_id,
-        "client_secret": client_secret,
-        "workspace_id": workspace_id,
-    }
 
-
-def get_token(config: dict) -> str:
-    """Acquire a Bearer token via OAuth2 client_credentials grant."""
-    url = f"https://login.microsoftonline.com/{config['tenant_id']}/oauth2/v2.0/token"
-    resp = requests.post(url, data={
-        "grant_type": "client_credentials",
-        "client_id": config["client_id"],
-        "client_secret": config["client_secret"],
-        "scope": "https://api.fabric.microsoft.com/.default",
-    })
-    resp.raise_for_status()
-    return resp.json()["access_token"]
-
-
-def api_get(token: str, url: str) -> dict:
+def api_get(client: FabricClient, url: str) -> dict:
     """Make an authenticated GET request to the Fabric REST API."""
-    resp = requests.get(url, headers={"Authorization": f"Bearer {token}"})
+    resp = client.get(url)
     resp.raise_for_status()
-    return resp.json()
+    return json_loads(resp.content)
 
 
 def main():
-    config = get_config()
-    base = "https://api.fabric.microsoft.com/v1"
+    config = get_config(parse_args())
     results = {"token": False, "list_items": False, "get_item": False}
 
     # --- Check 1: Token acquisition ---
@@ -82,7 +72,10 @@ def main():
     print("CHECK 1: Token Acquisition")
     print("-" * 60)
     try:
-        token = get_token(config)
+        # Always ask Entra ID -- a cached token would pass even after the
+        # secret was deleted or the SPN disabled. Checks 2-3 reuse it.
+        token = get_cached_token(config, SCOPE, refresh=True)["access_token"]
+        client = FabricClient.for_spn(config, SCOPE)
         print(f"  Token acquired (length={len(token)})")
         results["token"] = True
     except Exception as e:
@@ -96,27 +89,46 @@ def main():
     print("-" * 60)
     print("CHECK 2: List Workspace Items")
     print("-" * 60)
-    items_url = f"{base}/workspaces/{config['workspace_id']}/items"
+    items_url = f"{FABRIC_API}/workspaces/{config['workspace_id']}/items"
     print(f"  GET {items_url}")
     try:
-        data = api_get(token, items_url)
+        data = api_get(client, items_url)
         items = data.get("value", [])
         print(f"  Found {len(items)} item(s):")
         for item in items:
             print(f"    - {item.get('displayName', '?')} ({item.get('type', '?')})")
         results["list_items"] = True
 
-        # --- Check 3: Get first item by ID ---
-        if items:
+        # --- Check 3: Get each item by ID ---
+        if len(items) > 1:
+            print()
+            print("-" * 60)
+            print("CHECK 3: Get Specific Item")
+            print("-" * 60)
+            print(f"  GET {items_url}/{{itemId}}  ({len(items)} items)")
+            failed = 0
+            # Fan the per-item GETs out over the pooled session
+            with ThreadPoolExecutor(max_workers=8) as ex:
+                futs = {ex.submit(api_get, client, f"{items_url}/{it['id']}"): it for it in items}
+                for fut in as_completed(futs):
+                    try:
+                        detail = fut.result()
+                        print(f"    - {detail.get('displayName', '?')} "
+                              f"({detail.get('type', '?')}, ID: {detail.get('id', '?')})")
+                    except Exception as e:
+                        failed += 1
+                        print(f"    - {futs[fut].get('displayName', '?')}: FAILED: {e}")
+            results["get_item"] = failed == 0
+        elif items:
             print()
             print("-" * 60)
             print("CHECK 3: Get Specific Item")
             print("-" * 60)
             first = items[0]
-            item_url = f"{base}/workspaces/{config['workspace_id']}/items/{first['id']}"
+            item_url = f"{items_url}/{first['id']}"
             print(f"  GET {item_url}")
             try:
-                detail = api_get(token, item_url)
+                detail = api_get(client, item_url)
                 print(f"  Item: {detail.get('displayName', '?')}")
                 print(f"  Type: {detail.get('type', '?')}")
                 print(f"  ID:   {detail.get('id', '?')}")
@@ -0,0 +1,53 @@
+# MIT License - Copyright (c) 2026 apkola29
+# This script is provided as-is with no warranty. See LICENSE for details.
+
+"""
+Vendor common/fabric_common.py into each project folder.
+
+Each project folder is installed and run on its own, so it keeps an
+identical copy of the shared module next to its script.
+
+Usage:
+    python common/sync.py          # rewrite the vendored copies
+    python common/sync.py --check  # exit 1 if any copy is out of date
+"""
+
+import argparse
+import pathlib
+import sys
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+SOURCE = ROOT / "common" / "fabric_common.py"
+TARGETS = [
+    ROOT / "api-connectivity" / "fabric_common.py",
+    ROOT / "data-agent-spn" / "fabric_common.py",
+    ROOT / "mcp-client" / "fabric_common.py",
+    ROOT / "semantic-model-dax" / "fabric_common.py",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vendor fabric_common.py into each project")
+    parser.add_argument("--check", action="store_true",
+                        help="only report copies that differ from common/fabric_common.py")
+    args = parser.parse_args()
+
+    source = SOURCE.read_bytes()
+    stale = [p for p in TARGETS if not p.exists() or p.read_bytes() != source]
+
+    if args.check:
+        for p in stale:
+            print(f"  [STALE] {p.relative_to(ROOT)}")
+        if stale:
+            print("\n  Run: python common/sync.py")
+            raise SystemExit(1)
+        print("  All vendored copies are up to date.")
+        return
+
+    for p in stale:
+        p.write_bytes(source)
+        print(f"  Updated {p.relative_to(ROOT)}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
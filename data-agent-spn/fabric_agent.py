@@ -9,7 +9,7 @@ authentication. No user credentials are passed through -- only the SPN's
 client_credentials are used.
 
 Prerequisites:
-    pip install openai requests
+    pip install openai requests "httpx[http2]"
 
     The Data Agent must be published in the Fabric portal before it can be
     queried via this script.
@@ -41,15 +41,20 @@ API:
         ?api-version=2024-05-01-preview
 
 Usage:
-    python fabric_agent.py
+    python fabric_agent.py [--tenant-id ...] [--client-id ...] [--workspace-id ...] [--agent-id ...]
+
+    Any value not given as a flag or FABRIC_* environment variable is prompted for.
 """
 
 import typing as t
+import argparse
+import sys
 import time
 import uuid
-import requests
+import httpx
 
-from openai import OpenAI
+from fabric_common import FabricClient, SPN_FIELDS, build_parser, prompt_config
+from openai import DefaultHttpxClient, OpenAI
 from openai._models import FinalRequestOptions
 from openai._types import Omit
 from openai._utils import is_given
@@ -59,49 +64,30 @@ from openai._utils import is_given
 # Configuration
 # ---------------------------------------------------------------------------
 
-def get_config() -> dict:
-    """Prompt for SPN credentials and Fabric IDs. All fields are required."""
+SCOPE = "https://api.fabric.microsoft.com/.default"
+FABRIC_API = "https://api.fabric.microsoft.com/v1"
+
+# (config key, prompt label) -- each key also maps to a --flag and FABRIC_* env var
+CONFIG_FIELDS = SPN_FIELDS + [
+    ("workspace_id", "Workspace ID"),
+    ("agent_id", "Agent ID"),
+]
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse optional CLI flags. Each defaults to its FABRIC_* environment variable."""
+    return build_parser("Fabric Data Agent interactive client", CONFIG_FIELDS).parse_args()
+
+
+def get_config(args: argparse.Namespace) -> dict:
+    """Collect SPN credentials and Fabric IDs, prompting for any not given. All are required."""
     print("=" * 60)
     print("  Fabric Data Agent - Interactive Client")
     print("=" * 60)
     print()
     print("Enter your SPN and Fabric details below.")
     print()
-
-    tenant_id    = input("  Tenant ID      : ").strip()
-    client_id    = input("  Client ID      : ").strip()
-    client_secret = input("  Client Secret  : ").strip()
-    workspace_id = input("  Workspace ID   : ").strip()
-    agent_id     = input("  Agent ID       : ").strip()
-
-    if not all([tenant_id, client_id, client_secret, workspace_id, agent_id]):
-        print("\n  [ERROR] All fields are required.")
-        raise SystemExit(1)
-
-    return {
-        "tenant_id": tenant_id,
-        "client_id": client_id,
-        "client_secret": client_secret,
-        "workspace_id": workspace_id,
-        "agent_id": agent_id,
-    }
-
-
-# ---------------------------------------------------------------------------
-# Authentication
-# ---------------------------------------------------------------------------
-
-def get_token(config: dict) -> str:
-    """Acquire a Bearer token via OAuth2 client_credentials grant."""
-    url = f"https://login.microsoftonline.com/{config['tenant_id']}/oauth2/v2.0/token"
-    resp = requests.post(url, data={
-        "grant_type": "client_credentials",
-        "client_id": config["client_id"],
-        "client_secret": config["client_secret"],
-        "scope": "https://api.fabric.microsoft.com/.default",
-    })
-    resp.raise_for_status()
-    return resp.json()["access_token"]
+    return prompt_config(args, CONFIG_FIELDS)
 
 
 # ---------------------------------------------------------------------------
@@ -109,29 +95,58 @@ def get_token(config: dict) -> str:
 # ---------------------------------------------------------------------------
 
 class FabricOpenAI(OpenAI):
-    """OpenAI client that replaces API-key auth with a Fabric SPN Bearer token."""
+    """OpenAI client that replaces API-key auth with a Fabric SPN Bearer token.
+
+    The token is read from the FabricClient on every request (a cheap in-memory
+    check), so it is refreshed transparently if it expires mid-session.
+    """
 
-    def __init__(self, access_token: str, base_url: str, **kwargs: t.Any) -> None:
-        self._access_token = access_token
+    def __init__(self, fabric: FabricClient, base_url: str, **kwargs: t.Any) -> None:
+        self._fabric = fabric
+        self._activity_id = str(uuid.uuid4())
         default_query = kwargs.pop("default_query", {})
         default_query["api-version"] = "2024-05-01-preview"
+        # Agent traffic goes through httpx, not the requests SESSION (which
+        # only carries the token request here). The SDK would replay any call
+        # on 408/409/429, 5xx or a timeout without an Idempotency-Key, so a
+        # create could run twice -- nothing is retried unless a read opts in
+        # via with_options(max_retries=READ_MAX_RETRIES).
+        kwargs.setdefault("max_retries", 0)
+        if "http_client" not in kwargs:
+            # HTTP/2 multiplexes every SDK call and run poll over one connection
+            kwargs["http_client"] = DefaultHttpxClient(
+                http2=True,
+                limits=httpx.Limits(max_keepalive_connections=10, max_connections=20),
+            )
+        kwargs.setdefault("api_key", "not-used")
         super().__init__(
-            api_key="not-used",
             base_url=base_url,
             default_query=default_query,
             **kwargs,
         )
 
+    def copy(self, **kwargs: t.Any) -> "FabricOpenAI":
+        """Copy the client, keeping its token source, connection pool and ActivityId."""
+        clone = super().copy(_extra_kwargs={"fabric": self._fabric}, **kwargs)
+        clone._activity_id = self._activity_id
+        return clone
+
+    with_options = copy
+
+    def new_activity(self) -> None:
+        """Start a new ActivityId, shared by every request until the next call."""
+        self._activity_id = str(uuid.uuid4())
+
     def _prepare_options(self, options: FinalRequestOptions) -> None:
-        headers: dict[str, str | Omit] = (
-            {**options.headers} if is_given(options.headers) else {}
-        )
+        if is_given(options.headers):
+            headers: dict[str, str | Omit] = {**options.headers}
+        else:
+            headers = {}
         options.headers = headers
-        headers["Authorization"] = f"Bearer {self._access_token}"
-        if "Accept" not in headers:
-            headers["Accept"] = "application/json"
-        if "ActivityId" not in headers:
-            headers["ActivityId"] = str(uuid.uuid4())
+        self._fabric.token()
+        headers["Authorization"] = self._fabric.auth_header
+        headers.setdefault("Accept", "application/json")
+        headers.setdefault("ActivityId", self._activity_id)
         return super()._prepare_options(options)
 
 
@@ -139,8 +154,52 @@ class FabricOpenAI(OpenAI):
 # Agent interaction
 # ---------------------------------------------------------------------------
 
+TERMINAL_RUN_STATES = frozenset({
+    "completed", "failed", "cancelled", "expired", "incomplete", "requires_action",
+})
+
+# Retries for the polls, message reads and thread delete; the creates get none
+READ_MAX_RETRIES = 5
+
+# Seconds to wait for a run to reach a terminal state
+RUN_TIMEOUT = 300
+
+
+def next_poll_delay(delay: float, headers: t.Mapping[str, str], remaining: float) -> float:
+    """Return the next run-poll delay, preferring any interval the server suggests.
+
+    The result is clamped to ``[0, remaining]`` so a negative or oversized hint
+    can neither break the sleep nor run past the timeout.
+    """
+    next_delay = min(max(delay, 0.3) * 1.5, 5.0)
+    for name, parse in (("openai-poll-after-ms", lambda v: int(v) / 1000),
+                        ("Retry-After", float)):
+        value = headers.get(name)
+        if value is not None:
+            try:
+                next_delay = parse(value)
+                break
+            except ValueError:
+                pass
+    return max(0.0, min(next_delay, remaining))
+
+
+def write_progress(data: bytes, flush: bool = True) -> None:
+    """Write progress bytes straight to the stdout buffer, skipping the text layer."""
+    out = getattr(sys.stdout, "buffer", None)
+    if out is None:  # e.g. Jupyter, whose stdout has no byte buffer
+        sys.stdout.write(data.decode())
+        out = sys.stdout
+    else:
+        out.write(data)
+    if flush:
+        out.flush()
+
+
 def ask_agent(client: FabricOpenAI, question: str) -> str:
     """Send a question to the Data Agent and return the response text."""
+    client.new_activity()
+    reads = client.with_options(max_retries=READ_MAX_RETRIES)
     assistant = client.beta.assistants.create(model="not used")
     thread = client.beta.threads.create()
 
@@ -152,25 +211,35 @@ def ask_agent(client: FabricOpenAI, question: str) -> str:
             thread_id=thread.id, assistant_id=assistant.id,
         )
 
-        # Poll until the run reaches a terminal state
-        terminal = {"completed", "failed", "cancelled", "requires_action"}
+        # Poll until the run reaches a terminal state, backing off from a
+        # short initial delay so fast runs are picked up promptly
         start = time.time()
-        while run.status not in terminal:
-            if time.time() - start > 300:
+        delay = 0.3
+        last_flush = time.monotonic()
+        while run.status not in TERMINAL_RUN_STATES:
+            if time.time() - start > RUN_TIMEOUT:
                 print()
                 return "[ERROR] Timed out waiting for agent response."
-            print(".", end="", flush=True)
-            time.sleep(2)
-            run = client.beta.threads.runs.retrieve(
+            # Batch the dots while polls are rapid; flush at most every 0.5s,
+            # or right away before a sleep long enough to be noticed
+            now = time.monotonic()
+            flush = delay >= 0.5 or now - last_flush >= 0.5
+            write_progress(b".", flush=flush)
+            if flush:
+                last_flush = now
+            time.sleep(delay)
+            raw = reads.beta.threads.runs.with_raw_response.retrieve(
                 thread_id=thread.id, run_id=run.id,
             )
+            run = raw.parse()
+            delay = next_poll_delay(delay, raw.headers, RUN_TIMEOUT - (time.time() - start))
         print(" ", end="", flush=True)
 
         if run.status != "completed":
             return f"[ERROR] Run finished with status: {run.status}"
 
         # Extract the assistant's reply
-        messages = client.beta.threads.messages.list(
+        messages = reads.beta.threads.messages.list(
             thread_id=thread.id, order="asc",
         )
         for m in messages:
@@ -183,7 +252,7 @@ def ask_agent(client: FabricOpenAI, question: str) -> str:
 
     finally:
         try:
-            client.beta.threads.delete(thread_id=thread.id)
+            reads.beta.threads.delete(thread_id=thread.id)
         except Exception:
             pass
 
@@ -193,22 +262,23 @@ def ask_agent(client: FabricOpenAI, question: str) -> str:
 # ---------------------------------------------------------------------------
 
 def main():
-    config = get_config()
+    config = get_config(parse_args())
 
     print()
     print("Authenticating...", end=" ", flush=True)
     try:
-        token = get_token(config)
+        fabric = FabricClient.for_spn(config, SCOPE)
+        fabric.token()
     except Exception as e:
         print(f"FAILED\n  {e}")
         return
     print("OK")
 
     base_url = (
-        f"https://api.fabric.microsoft.com/v1/workspaces/"
+        f"{FABRIC_API}/workspaces/"
         f"{config['workspace_id']}/dataagents/{config['agent_id']}/aiassistant/openai"
     )
-    client = FabricOpenAI(access_token=token, base_url=base_url)
+    client = FabricOpenAI(fabric, base_url=base_url)
 
     print()
     print("Connected to Data Agent. Type your questions below.")
@@ -229,7 +299,7 @@ def main():
             print("Goodbye.")
             break
 
-        print("Agent: ", end="", flush=True)
+        write_progress(b"Agent: ")
         try:
             answer = ask_agent(client, question)
             print(answer)
@@ -20,103 +20,124 @@ Authentication:
 MCP Endpoint:
     POST https://api.fabric.microsoft.com/v1/mcp/workspaces/{workspaceId}
          /dataagents/{agentId}/agent
-    Headers: Authorization: Bearer {token}, Content-Type: application/json
+    Headers: Authorization: Bearer {token}, Content-Type: application/json,
+             Mcp-Session-Id (echoed once the server assigns one)
     Body:    JSON-RPC 2.0 message
 
 Usage:
-    python mcp_client.py
+    python mcp_client.py [--tenant-id ...] [--client-id ...] [--workspace-id ...] [--agent-id ...]
+
+    Any value not given as a flag or FABRIC_* environment variable is prompted for.
 """
 
+import argparse
 import json
-import requests
+from fabric_common import (
+    FabricClient, JSON_HEADERS, SPN_FIELDS, build_parser, json_dumps, json_loads, prompt_config,
+)
+
+
+SCOPE = "https://api.fabric.microsoft.com/.default"
+FABRIC_API = "https://api.fabric.microsoft.com/v1"
+
+# Methods with side effects on the server -- never replayed after a 5xx
+NON_IDEMPOTENT_METHODS = frozenset({"tools/call"})
+
+# (config key, prompt label) -- each key also maps to a --flag and FABRIC_* env var
+CONFIG_FIELDS = SPN_FIELDS + [
+    ("workspace_id", "Workspace ID"),
+    ("agent_id", "Agent ID"),
+]
+
 
+def parse_args() -> argparse.Namespace:
+    """Parse optional CLI flags. Each defaults to its FABRIC_* environment variable."""
+    return build_parser("Fabric Data Agent MCP client", CONFIG_FIELDS).parse_args()
 
-def get_config() -> dict:
-    """Prompt for SPN credentials and Fabric IDs."""
+
+def get_config(args: argparse.Namespace) -> dict:
+    """Collect SPN credentials and Fabric IDs, prompting for any not given."""
     print("=" * 60)
     print("  Fabric Data Agent - MCP Client")
     print("=" * 60)
     print()
     print("Enter your SPN and Fabric details below.")
     print()
-
-    tenant_id    = input("  Tenant ID      : ").strip()
-    client_id    = input("  Client ID      : ").strip()
-    client_secret = input("  Client Secret  : ").strip()
-    workspace_id = input("  Workspace ID   : ").strip()
-    agent_id     = input("  Agent ID       : ").strip()
-
-    if not all([tenant_id, client_id, client_secret, workspace_id, agent_id]):
-        print("\n  [ERROR] All fields are required.")
-        raise SystemExit(1)
-
-    return {
-        "tenant_id": tenant_id,
-        "client_id": client_id,
-        "client_secret": client_secret,
-        "workspace_id": workspace_id,
-        "agent_id": agent_id,
-    }
-
-
-def get_token(config: dict) -> str:
-    """Acquire a Bearer token via OAuth2 client_credentials grant."""
-    url = f"https://login.microsoftonline.com/{config['tenant_id']}/oauth2/v2.0/token"
-    resp = requests.post(url, data={
-        "grant_type": "client_credentials",
-        "client_id": config["client_id"],
-        "client_secret": config["client_secret"],
-        "scope": "https://api.fabric.microsoft.com/.default",
-    })
-    resp.raise_for_status()
-    return resp.json()["access_token"]
-
-
-def mcp_request(token: str, mcp_url: str, method: str,
-                params: dict = None, req_id: int = 1) -> dict:
-    """Send a JSON-RPC 2.0 request to the MCP server and return the result."""
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Content-Type": "application/json",
-        "Accept": "application/json",
-    }
-    payload = {"jsonrpc": "2.0", "id": req_id, "method": method}
-    if params:
-        payload["params"] = params
-
-    resp = requests.post(mcp_url, headers=headers, json=payload)
-
-    content_type = resp.headers.get("Content-Type", "")
-    if "text/event-stream" in content_type:
-        # SSE stream -- extract the last JSON-RPC result from the event data
-        result = {}
-        for line in resp.text.split("\n"):
-            line = line.strip()
-            if line.startswith("data:"):
-                try:
-                    result = json.loads(line[len("data:"):].strip())
-                except json.JSONDecodeError:
-                    pass
-        return result
-    else:
-        resp.raise_for_status()
-        return resp.json()
+    return prompt_config(args, CONFIG_FIELDS)
+
+
+class McpSession:
+    """Long-lived JSON-RPC 2.0 transport to an MCP server (Streamable HTTP).
+
+    Every call reuses the FabricClient's pooled keep-alive connection; tools/call
+    draws on the same pool under a retry policy that never replays it after a
+    5xx. If the server assigns an Mcp-Session-Id during initialize, it is sent
+    back on every later call so the server can keep its session state.
+    """
+
+    def __init__(self, client: FabricClient, url: str) -> None:
+        self.client = client
+        self.url = url
+        self._headers = {**JSON_HEADERS, "Accept": "application/json, text/event-stream"}
+        self._next_id = 1
+
+    def rpc_call(self, method: str, params: dict = None) -> dict:
+        """Send a JSON-RPC request and return the matching response message."""
+        req_id = self._next_id
+        self._next_id += 1
+        payload = {"jsonrpc": "2.0", "id": req_id, "method": method}
+        if params:
+            payload["params"] = params
+
+        with self.client.post(
+            self.url,
+            idempotent=method not in NON_IDEMPOTENT_METHODS,
+            headers=self._headers,
+            data=json_dumps(payload),
+            stream=True,
+        ) as resp:
+            session_id = resp.headers.get("Mcp-Session-Id")
+            if session_id:
+                self._headers["Mcp-Session-Id"] = session_id
+
+            content_type = resp.headers.get("Content-Type", "")
+            if "text/event-stream" in content_type:
+                # SSE stream -- keep the response for this id, else the last
+                # message seen. Lines stay as bytes so json decodes them as
+                # UTF-8. The stream is read to the end even after a match:
+                # closing it early drops the keep-alive connection instead
+                # of returning it to the pool.
+                result = {}
+                matched = False
+                for line in resp.iter_lines():
+                    if matched or not line.startswith(b"data:"):
+                        continue
+                    try:
+                        result = json_loads(line[len(b"data:"):])
+                    except json.JSONDecodeError:
+                        continue
+                    matched = isinstance(result, dict) and result.get("id") == req_id
+                return result
+            else:
+                resp.raise_for_status()
+                return json_loads(resp.content)
 
 
 def main():
-    config = get_config()
+    config = get_config(parse_args())
 
     print()
     print("Authenticating...", end=" ", flush=True)
     try:
-        token = get_token(config)
+        client = FabricClient.for_spn(config, SCOPE)
+        client.token()
     except Exception as e:
         print(f"FAILED\n  {e}")
         return
     print("OK")
 
     mcp_url = (
-        f"https://api.fabric.microsoft.com/v1/mcp/workspaces/"
+        f"{FABRIC_API}/mcp/workspaces/"
         f"{config['workspace_id']}/dataagents/{config['agent_id']}/agent"
     )
 
@@ -125,11 +146,12 @@ def main():
     print("-" * 60)
     print("Step 1: MCP Initialize")
     print("-" * 60)
-    init_resp = mcp_request(token, mcp_url, "initialize", {
+    mcp = McpSession(client, mcp_url)
+    init_resp = mcp.rpc_call("initialize", {
         "protocolVersion": "2024-11-05",
         "capabilities": {},
         "clientInfo": {"name": "fabric-mcp-client", "version": "1.0.0"},
-    }, req_id=1)
+    })
 
     server_info = init_resp.get("result", {}).get("serverInfo", {})
     print(f"  Server: {server_info.get('name', '?')} v{server_info.get('version', '?')}")
@@ -140,7 +162,7 @@ def main():
     print("-" * 60)
     print("Step 2: List Available Tools")
     print("-" * 60)
-    tools_resp = mcp_request(token, mcp_url, "tools/list", {}, req_id=2)
+    tools_resp = mcp.rpc_call("tools/list", {})
 
     tools = tools_resp.get("result", {}).get("tools", [])
     if not tools:
@@ -149,9 +171,9 @@ def main():
 
     tool_name = tools[0].get("name", "")
     print(f"  Found {len(tools)} tool(s):")
-    for t in tools:
-        print(f"    - {t.get('name', '?')}")
-        schema = t.get("inputSchema", {})
+    for tool in tools:
+        print(f"    - {tool.get('name', '?')}")
+        schema = tool.get("inputSchema", {})
         props = schema.get("properties", {})
         for prop, info in props.items():
             req = "required" if prop in schema.get("required", []) else "optional"
@@ -164,7 +186,6 @@ def main():
     print("Type your questions below. Type 'quit' or 'exit' to stop.")
     print("-" * 60)
 
-    req_id = 3
     while True:
         print()
         try:
@@ -181,11 +202,10 @@ def main():
 
         print("Agent: ", end="", flush=True)
         try:
-            resp = mcp_request(token, mcp_url, "tools/call", {
+            resp = mcp.rpc_call("tools/call", {
                 "name": tool_name,
                 "arguments": {"userQuestion": question},
-            }, req_id=req_id)
-            req_id += 1
+            })
 
             # Extract response text
             result = resp.get("result", {})
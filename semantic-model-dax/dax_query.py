@@ -33,40 +33,50 @@ API Endpoints:
         https://learn.microsoft.com/en-us/rest/api/power-bi/datasets/get-datasets-in-group
 
 Usage:
-    python dax_query.py
+    python dax_query.py [--auth spn|interactive] [--workspace-id ...] [--dataset-id ...] [--all-rows]
+
+    Any value not given as a flag or FABRIC_* environment variable is prompted for.
 """
 
+import argparse
+import codecs
+import itertools
 import json
+import os
+import sys
+import typing as t
 import requests
+from fabric_common import (
+    FabricClient, JSON_HEADERS, SPN_FIELDS, build_parser, get_cached_token,
+    json_dumps, json_loads, prompt_config,
+)
+
+try:
+    import ijson
+except ImportError:  # ijson is optional -- previews then parse the full response
+    ijson = None
 
 
 # ---------------------------------------------------------------------------
 # Authentication
 # ---------------------------------------------------------------------------
 
-def auth_spn() -> str:
-    """Authenticate with Service Principal (client_credentials)."""
-    tenant_id    = input("  Tenant ID      : ").strip()
-    client_id    = input("  Client ID      : ").strip()
-    client_secret = input("  Client Secret  : ").strip()
+SCOPE = "https://analysis.windows.net/powerbi/api/.default"
 
-    if not all([tenant_id, client_id, client_secret]):
-        print("\n  [ERROR] All SPN fields are required.")
-        raise SystemExit(1)
 
-    url = f"https://login.microsoftonline.com/{tenant_id}/oauth2/v2.0/token"
-    resp = requests.post(url, data={
-        "grant_type": "client_credentials",
-        "client_id": client_id,
-        "client_secret": client_secret,
-        "scope": "https://analysis.windows.net/powerbi/api/.default",
-    })
-    resp.raise_for_status()
-    return resp.json()["access_token"]
+def auth_spn(args: argparse.Namespace) -> t.Callable[[], tuple[str, float]]:
+    """Authenticate with Service Principal (client_credentials); returns a token fetcher."""
+    config = prompt_config(args, SPN_FIELDS)
+
+    def fetch() -> tuple[str, float]:
+        entry = get_cached_token(config, SCOPE)
+        return entry["access_token"], entry["expires_at"]
 
+    return fetch
 
-def auth_interactive() -> str:
-    """Authenticate interactively via browser (supports MFA)."""
+
+def auth_interactive() -> t.Callable[[], tuple[str, float]]:
+    """Authenticate interactively via browser (supports MFA); returns a token fetcher."""
     try:
         from azure.identity import InteractiveBrowserCredential
     except ImportError:
@@ -75,97 +85,166 @@ def auth_interactive() -> str:
         raise SystemExit(1)
 
     credential = InteractiveBrowserCredential()
-    token = credential.get_token("https://analysis.windows.net/powerbi/api/.default")
-    return token.token
+
+    def fetch() -> tuple[str, float]:
+        # azure-identity caches and silently refreshes the token via MSAL
+        token = credential.get_token(SCOPE)
+        return token.token, token.expires_on - 60
+
+    return fetch
 
 
 # ---------------------------------------------------------------------------
 # API helpers
 # ---------------------------------------------------------------------------
 
-def list_datasets(token: str, workspace_id: str) -> list:
-    """List all semantic models (datasets) in a workspace."""
-    url = f"https://api.powerbi.com/v1.0/myorg/groups/{workspace_id}/datasets"
-    resp = requests.get(url, headers={
-        "Authorization": f"Bearer {token}",
-    })
-    resp.raise_for_status()
-    return resp.json().get("value", [])
-
-
-def execute_dax(token: str, dataset_id: str, dax: str) -> dict:
-    """Execute a DAX query against a dataset and return the result."""
-    url = f"https://api.powerbi.com/v1.0/myorg/datasets/{dataset_id}/executeQueries"
-    resp = requests.post(url,
-        headers={
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json",
-        },
-        json={"queries": [{"query": dax}]},
-    )
-    resp.raise_for_status()
-    return resp.json()
+POWERBI_API = "https://api.powerbi.com/v1.0/myorg"
+PREVIEW_ROWS = 20
 
 
-def print_dax_result(result: dict):
-    """Pretty-print a DAX query result."""
-    tables = result.get("results", [])
-    for i, table in enumerate(tables):
-        rows = table.get("tables", [{}])[0].get("rows", [])
-        if not rows:
-            print("  (no rows returned)")
-            continue
-        # Print column headers
-        columns = list(rows[0].keys())
-        print(f"  Columns: {', '.join(columns)}")
+class _SkipBom:
+    """Read-only view of a byte stream that drops a leading UTF-8 BOM.
+
+    ijson rejects a BOM-prefixed body, which Power BI often sends.
+    """
+
+    def __init__(self, raw: t.BinaryIO) -> None:
+        self._raw = raw
+        self._head = raw.read(len(codecs.BOM_UTF8)).removeprefix(codecs.BOM_UTF8)
+
+    def read(self, size: int = -1) -> bytes:
+        if not self._head:
+            return self._raw.read(size)
+        if 0 <= size < len(self._head):
+            chunk, self._head = self._head[:size], self._head[size:]
+            return chunk
+        head, self._head = self._head, b""
+        return head + self._raw.read(size - len(head) if size >= 0 else -1)
+
+
+def list_datasets(client: FabricClient, workspace_id: str) -> list:
+    """List all semantic models (datasets) in a workspace."""
+    url = f"{POWERBI_API}/groups/{workspace_id}/datasets"
+    resp = client.get(url)
+    resp.raise_for_status()
+    return json_loads(resp.content).get("value", [])
+
+
+def execute_dax(client: FabricClient, dataset_id: str, dax: str,
+                limit: int | None = PREVIEW_ROWS) -> list:
+    """Execute a DAX query against a dataset and return its result rows.
+
+    With a limit, only the first ``limit + 1`` rows are parsed (the extra row
+    signals that more exist) and the rest of the response is never read.
+    Pass ``limit=None`` to materialize every row.
+    """
+    url = f"{POWERBI_API}/datasets/{dataset_id}/executeQueries"
+    with client.post(url,
+        headers=JSON_HEADERS,
+        data=json_dumps({"queries": [{"query": dax}]}),
+        stream=True,
+    ) as resp:
+        if not resp.ok:
+            resp.content  # Buffer the error body before the connection is released
+            resp.raise_for_status()
+
+        if limit is not None and ijson is not None:
+            resp.raw.decode_content = True
+            rows = ijson.items(_SkipBom(resp.raw), "results.item.tables.item.rows.item", use_float=True)
+            return list(itertools.islice(rows, limit + 1))
+
+        result = json_loads(resp.content)
+        rows = [
+            row
+            for res in result.get("results", [])
+            for table in res.get("tables", [])
+            for row in table.get("rows", [])
+        ]
+        return rows if limit is None else rows[:limit + 1]
+
+
+def print_dax_result(rows: list, limit: int | None = PREVIEW_ROWS):
+    """Pretty-print DAX result rows, showing at most ``limit`` of them."""
+    if not rows:
+        print("  (no rows returned)")
+        return
+    shown = rows if limit is None else rows[:limit]
+    # Print column headers
+    columns = tuple(rows[0].keys())
+    print(f"  Columns: {', '.join(columns)}")
+    if len(rows) > len(shown):
+        print(f"  Rows: {len(shown)}+ (preview)")
+    else:
         print(f"  Rows: {len(rows)}")
-        print()
-        # Print first 20 rows
-        for j, row in enumerate(rows[:20]):
-            vals = [str(row.get(c, "")) for c in columns]
-            print(f"    {' | '.join(vals)}")
-        if len(rows) > 20:
-            print(f"    ... ({len(rows) - 20} more rows)")
+    print()
+    # Print the rows in a single write
+    sys.stdout.write("".join(
+        "    " + " | ".join([str(row.get(c, "")) for c in columns]) + "\n"
+        for row in shown
+    ))
+    if len(rows) > len(shown):
+        print("    ... (more rows not shown)")
 
 
 # ---------------------------------------------------------------------------
 # Main
 # ---------------------------------------------------------------------------
 
+def parse_args() -> argparse.Namespace:
+    """Parse optional CLI flags. Each defaults to its FABRIC_* environment variable."""
+    parser = build_parser(
+        "Fabric semantic model DAX query client",
+        SPN_FIELDS + [("workspace_id", "Workspace ID"), ("dataset_id", "Dataset ID")],
+    )
+    parser.add_argument("--auth", choices=["spn", "interactive"],
+                        default=os.environ.get("FABRIC_AUTH"))
+    parser.add_argument("--all-rows", action="store_true",
+                        help=f"print every result row instead of the first {PREVIEW_ROWS}")
+    args = parser.parse_args()
+    # choices only checks values given on the command line, not the env default
+    if args.auth is not None and args.auth not in ("spn", "interactive"):
+        parser.error(f"FABRIC_AUTH must be 'spn' or 'interactive', got {args.auth!r}")
+    return args
+
+
 def main():
+    args = parse_args()
+    limit = None if args.all_rows else PREVIEW_ROWS
+
     print("=" * 60)
     print("  Fabric Semantic Model - DAX Query Client")
     print("=" * 60)
     print()
 
     # Choose auth method
-    print("Authentication method:")
-    print("  1. Service Principal (SPN)")
-    print("  2. Interactive Browser (MFA)")
-    print()
-    choice = input("  Select [1/2]: ").strip()
+    if args.auth:
+        choice = "2" if args.auth == "interactive" else "1"
+    else:
+        print("Authentication method:")
+        print("  1. Service Principal (SPN)")
+        print("  2. Interactive Browser (MFA)")
+        print()
+        choice = input("  Select [1/2]: ").strip()
 
     print()
     if choice == "2":
         print("Opening browser for login...")
-        token = auth_interactive()
+        client = FabricClient(auth_interactive())
     else:
-        token = auth_spn()
+        client = FabricClient(auth_spn(args))
+    client.token()
     print("Authenticated.")
 
     # Get workspace ID
     print()
-    workspace_id = input("  Workspace ID   : ").strip()
-    if not workspace_id:
-        print("\n  [ERROR] Workspace ID is required.")
-        raise SystemExit(1)
+    workspace_id = prompt_config(args, [("workspace_id", "Workspace ID")])["workspace_id"]
 
     # List datasets
     print()
     print("-" * 60)
     print("Semantic Models in Workspace")
     print("-" * 60)
-    datasets = list_datasets(token, workspace_id)
+    datasets = list_datasets(client, workspace_id)
 
     if not datasets:
         print("  No semantic models found in this workspace.")
@@ -176,7 +255,13 @@ def main():
 
     # Select dataset
     print()
-    if len(datasets) == 1:
+    if args.dataset_id:
+        selected = next((ds for ds in datasets if ds["id"] == args.dataset_id), None)
+        if selected is None:
+            print(f"  [ERROR] Dataset {args.dataset_id} not found in this workspace.")
+            return
+        print(f"  Using: {selected['name']}")
+    elif len(datasets) == 1:
         selected = datasets[0]
         print(f"  Using: {selected['name']}")
     else:
@@ -210,12 +295,12 @@ def main():
             break
 
         try:
-            result = execute_dax(token, selected["id"], dax)
+            rows = execute_dax(client, selected["id"], dax, limit=limit)
             print()
-            print_dax_result(result)
+            print_dax_result(rows, limit=limit)
         except requests.HTTPError as e:
             try:
-                err = e.response.json()
+                err = json_loads(e.response.content)
                 code = err.get("error", {}).get("code", "")
                 if code == "PowerBINotAuthorizedException":
                     print("  [ERROR] Not authorized. The SPN/user needs Build")